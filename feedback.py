@@ -0,0 +1,137 @@
+"""This file records match ratings and folds them into the platform graphs in batches"""
+
+from typing import Any
+from generate_graph import WeightedGraph
+import pandas as pd
+import numpy as np
+import csv
+import io
+import os
+import pickle
+import time
+
+LOG_COLUMNS = ["user", "match", "rating", "timestamp"]
+
+# how strongly ratings can scale an edge's generated weight; a mean rating of 5 multiplies it by
+# (1 + FEEDBACK_RATE) and a mean rating of 1 by (1 - FEEDBACK_RATE), however many batches are applied
+FEEDBACK_RATE = 0.2
+
+
+def record_ratings(platform: str, user: Any, ratings: dict[Any, int]) -> None:
+    """Append ratings (match -> star rating out of 5) given by user to the platform's feedback log
+
+    The log is append-only and is only read by apply_feedback, so recording is constant work per
+    rating.
+    """
+    os.makedirs(platform, exist_ok=True)
+    timestamp = time.time()
+    with open(f"{platform}/feedback_log.csv", "a", newline="") as f:
+        writer = csv.writer(f)
+        for match, rating in ratings.items():
+            writer.writerow([user, match, rating, timestamp])
+
+
+def load_partition(platform_graph: WeightedGraph) -> dict[Any, int]:
+    """Return the community partition saved with platform_graph, or cluster platform_graph if there is
+    none yet (the partition is only saved by apply_feedback, so reading never changes the saved files)"""
+    if platform_graph.partition is not None:
+        return platform_graph.partition
+
+    return platform_graph.cluster()
+
+
+def _save_pickle(obj: Any, path: str) -> None:
+    """Pickle obj to path, replacing the file atomically so readers never see a partial write"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(temp_path, path)
+
+
+def _read_new_feedback(platform: str, offset: int) -> tuple[pd.DataFrame, int]:
+    """Return the complete feedback log lines of a platform after offset, along with the log offset
+    just past them"""
+    log_file = f"{platform}/feedback_log.csv"
+    if not os.path.exists(log_file):
+        return pd.DataFrame(columns=LOG_COLUMNS), offset
+
+    with open(log_file, "rb") as f:
+        f.seek(offset)
+        new_bytes = f.read()
+
+    # ignore a trailing line that is still being written
+    new_bytes = new_bytes[:new_bytes.rfind(b"\n") + 1]
+    if not new_bytes:
+        return pd.DataFrame(columns=LOG_COLUMNS), offset
+
+    feedback = pd.read_csv(io.BytesIO(new_bytes), names=LOG_COLUMNS, header=None)
+    return feedback, offset + len(new_bytes)
+
+
+def apply_feedback(platform: str) -> int:
+    """Fold all new ratings in the platform's feedback log into its graph edge weights, refresh the
+    partition for the affected communities only, and return the number of edges adjusted
+
+    Only each user's latest rating of a match counts. An edge's weight is set to its generated weight
+    times 1 + FEEDBACK_RATE * (mean_rating - 3) / 2, where mean_rating averages the latest ratings its
+    two players gave each other, so repeated ratings or batches never compound. The lookups are one
+    pass over the rated edges, the weight arithmetic is vectorised, and dynamic_adjustment is still
+    applied per edge.
+
+    The log offset, ratings, generated weights and partition are all stored in the graph itself, so
+    they are saved together in one atomic replace and a crashed run never applies ratings twice.
+    """
+    with open(f"{platform}/platform_graph.pkl", "rb") as f:
+        platform_graph = pickle.load(f)
+
+    feedback, new_offset = _read_new_feedback(platform, platform_graph.feedback_offset)
+    if feedback.empty:
+        return 0
+    vertices = platform_graph.get_vertices()
+
+    feedback = feedback[feedback["user"].isin(list(vertices)) & feedback["match"].isin(list(vertices))
+                        & (feedback["user"] != feedback["match"])]
+    # a user's latest rating of a match replaces any earlier one
+    latest = feedback.drop_duplicates(["user", "match"], keep="last")
+    rated = list(zip(latest["user"].tolist(), latest["match"].tolist()))
+    platform_graph.ratings.update(zip(rated, latest["rating"].clip(1, 5).tolist()))
+
+    # edges are undirected, so an edge's mean rating covers the ratings of both of its players
+    edges, base_weights, mean_ratings = [], [], []
+    for node_1, node_2 in {tuple(sorted(key)) for key in rated}:
+        if not platform_graph.check_connected(node_1, node_2):
+            continue
+        ratings = [platform_graph.ratings[key] for key in [(node_1, node_2), (node_2, node_1)]
+                   if key in platform_graph.ratings]
+        edges.append((node_1, node_2))
+        base_weights.append(platform_graph.base_weights.setdefault(
+            (node_1, node_2), vertices[node_1].neighbours[vertices[node_2]]))
+        mean_ratings.append(sum(ratings) / len(ratings))
+
+    factors = np.clip(1 + FEEDBACK_RATE * (np.array(mean_ratings, dtype=float) - 3) / 2,
+                      1 - FEEDBACK_RATE, 1 + FEEDBACK_RATE)
+    new_weights = np.array(base_weights, dtype=float) * factors
+
+    for (node_1, node_2), new_weight in zip(edges, new_weights):
+        platform_graph.dynamic_adjustment(node_1, node_2, float(new_weight))
+
+    # recluster only the communities containing a player whose edges changed
+    partition = load_partition(platform_graph)
+    touched = {node for edge in edges for node in edge}
+    affected = {partition[node] for node in touched if node in partition}
+    region = {node for node, cluster in partition.items() if cluster in affected}
+    next_cluster = max(partition.values(), default=-1) + 1
+    for node, cluster in platform_graph.cluster(region).items():
+        partition[node] = next_cluster + cluster
+
+    platform_graph.partition = partition
+    platform_graph.feedback_offset = new_offset
+    _save_pickle(platform_graph, f"{platform}/platform_graph.pkl")
+
+    return len(edges)
+
+
+if __name__ == "__main__":
+    for i in ["playstation", "xbox", "steam"]:
+        if os.path.exists(f"{i}/platform_graph.pkl"):
+            print(i, apply_feedback(i))
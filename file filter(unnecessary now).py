@@ -1,50 +1,159 @@
-"""This file reads user data and creates a mapping to othe ruser characteristics"""
+"""This file samples valid players from the raw archive data and writes filtered copies of their data
 
+The archive CSVs are streamed in chunks, so memory stays bounded by the chunk size, the sample and
+the ids of valid players rather than by the size of the archive.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
 import pandas as pd
 # import pickle
 import os
 import random
 
+CHUNK_SIZE = 100_000
+
+
+def _players_with_achievements(platform: str, chunksize: int) -> set[int]:
+    """Return the ids of players with at least one achievement, in one chunked pass over history.csv"""
+    achievers = set()
+    for chunk in pd.read_csv(f"archive/{platform}/history.csv", usecols=["playerid"], chunksize=chunksize):
+        achievers.update(chunk["playerid"].unique().tolist())
+    return achievers
 
-def create_user_data_file(platform: str) -> dict[int, dict[str, str | int | list]]:
-    """Creates and returns user data as a complex dictionary"""
-    random.seed(1234)
-    """function generates a dicitonary object with user attributes from a specific platform"""
+
+def _valid_players(platform: str, chunksize: int) -> set[int]:
+    """Return the ids of players with a non-empty library and at least one achievement, in one chunked
+    pass over each of history.csv and purchased_games.csv"""
+    achievers = _players_with_achievements(platform, chunksize)
     valid_players = set()
-    player_info = pd.read_csv(f"archive/{platform}/players.csv")
-    game_info = pd.read_csv(f"archive/{platform}/purchased_games.csv")
-    achieve_info = pd.read_csv(f"archive/{platform}/history.csv")
+    for chunk in pd.read_csv(f"archive/{platform}/purchased_games.csv", usecols=["playerid", "library"],
+                             chunksize=chunksize):
+        libraries = chunk["library"].fillna("").astype(str).str.strip()
+        is_valid = (libraries != "") & (libraries != "[]") & chunk["playerid"].isin(achievers)
+        valid_players.update(chunk.loc[is_valid, "playerid"].tolist())
+    return valid_players
+
+
+def _stratum(row: dict[str, Any], stratify_by_country: bool) -> Optional[str]:
+    """Return the stratum of a players.csv row: its country if stratify_by_country is True, else None"""
+    country = row.get("country") if stratify_by_country else None
+    return None if pd.isna(country) else country
+
+
+def _stratum_quotas(platform: str, valid_players: set[int], sample_size: int,
+                    chunksize: int) -> dict[Optional[str], int]:
+    """Return how many players to sample from each country, in one chunked counting pass over
+    players.csv, splitting sample_size in proportion to the countries' numbers of valid players"""
+    counts = {}
+    for chunk in pd.read_csv(f"archive/{platform}/players.csv", usecols=["playerid", "country"],
+                             chunksize=chunksize):
+        chunk = chunk[chunk["playerid"].isin(valid_players)]
+        for country, count in chunk["country"].value_counts(dropna=False).items():
+            stratum = None if pd.isna(country) else country
+            counts[stratum] = counts.get(stratum, 0) + int(count)
+
+    total = sum(counts.values())
+    if total <= sample_size:
+        return counts
+
+    # split the sample between strata by largest remainder
+    shares = {stratum: sample_size * count / total for stratum, count in counts.items()}
+    quotas = {stratum: int(share) for stratum, share in shares.items()}
+    remaining = sample_size - sum(quotas.values())
+    for stratum in sorted(shares, key=lambda s: shares[s] - quotas[s], reverse=True)[:remaining]:
+        quotas[stratum] += 1
+    return quotas
+
 
-    player_dict = player_info.set_index('playerid').to_dict(orient='index')
-    game_dict = game_info.set_index('playerid').to_dict(orient='index')
-    achieve_dict = achieve_info.groupby('playerid')['achievementid'].apply(list).to_dict()
+def _reservoir_sample(platform: str, valid_players: set[int], sample_size: int, stratify_by_country: bool,
+                      chunksize: int, rng: random.Random) -> list[dict[str, Any]]:
+    """Return the rows of a uniform sample of sample_size valid players, in one chunked pass over
+    players.csv using reservoir sampling
 
-    for player in player_dict.keys():
-        if player in game_dict:
-            if player in achieve_dict:
-                if game_dict[player]["library"] != [] and achieve_dict[player] != []:
-                    valid_players.add(player)
+    If stratify_by_country is True, a counting pass first fixes each country's share of the sample,
+    and each country keeps a reservoir of exactly that size, so at most sample_size rows are held.
+    """
+    if stratify_by_country:
+        quotas = _stratum_quotas(platform, valid_players, sample_size, chunksize)
+    else:
+        quotas = {None: sample_size}
 
-    valid_players = set(random.sample(list(valid_players), 1000))
+    reservoirs = {stratum: [] for stratum in quotas}
+    seen = {stratum: 0 for stratum in quotas}
+    for chunk in pd.read_csv(f"archive/{platform}/players.csv", chunksize=chunksize):
+        chunk = chunk[chunk["playerid"].isin(valid_players)]
+        for row in chunk.to_dict(orient="records"):
+            stratum = _stratum(row, stratify_by_country)
+            quota = quotas.get(stratum, 0)
+            if quota == 0:
+                continue
+            reservoir = reservoirs[stratum]
+            seen[stratum] += 1
 
-    # Filter the DataFrame to keep only the specified player IDs
-    filtered_players = player_info[player_info['playerid'].isin(valid_players)]
-    filtered_games = game_info[game_info['playerid'].isin(valid_players)]
-    filtered_achieve = achieve_info[achieve_info['playerid'].isin(valid_players)]
+            if len(reservoir) < quota:
+                reservoir.append(row)
+            else:
+                index = rng.randrange(seen[stratum])
+                if index < quota:
+                    reservoir[index] = row
+
+    return [row for reservoir in reservoirs.values() for row in reservoir]
+
+
+def _write_filtered(source: str, destination: str, players: set[int], chunksize: int) -> None:
+    """Write the rows of source belonging to players to destination, one chunk at a time"""
+    header = True
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        chunk[chunk["playerid"].isin(players)].to_csv(destination, mode="w" if header else "a",
+                                                      header=header, index=False)
+        header = False
+
+
+def create_user_data_file(platform: str, sample_size: int = 1000, stratify_by_country: bool = False,
+                          seed: Optional[int] = 1234, chunksize: int = CHUNK_SIZE) -> set[int]:
+    """Sample sample_size valid players (non-empty library and achievements) from archive/<platform>,
+    write their rows of players.csv, purchased_games.csv and history.csv to <platform>/ and return
+    the sampled player ids
+
+    If stratify_by_country is True, the sample is stratified by the players' country.
+    """
+    rng = random.Random(seed)
+    valid_players = _valid_players(platform, chunksize)
+    sampled_rows = _reservoir_sample(platform, valid_players, sample_size, stratify_by_country, chunksize, rng)
+    sampled_players = {row["playerid"] for row in sampled_rows}
 
     os.makedirs(platform, exist_ok=True)
 
-    # Save the filtered DataFrame to a new CSV file
-    filtered_players.to_csv(f'{platform}/players.csv', index=False)
-    filtered_games.to_csv(f'{platform}/purchased_games.csv', index=False)
-    filtered_achieve.to_csv(f'{platform}/history.csv', index=False)
+    # Save the filtered data to new CSV files
+    columns = pd.read_csv(f"archive/{platform}/players.csv", nrows=0).columns
+    pd.DataFrame(sampled_rows, columns=columns).to_csv(f'{platform}/players.csv', index=False)
+    _write_filtered(f"archive/{platform}/purchased_games.csv", f'{platform}/purchased_games.csv',
+                    sampled_players, chunksize)
+    _write_filtered(f"archive/{platform}/history.csv", f'{platform}/history.csv', sampled_players, chunksize)
 
-    return player_dict
+    return sampled_players
 
 
-if __name__ == "__main__":
-    for i in ["playstation", "steam", "xbox"]:
-        print("starting ", i)
-        create_user_data_file(i)
-        print("finished ", i)
+def create_user_data_files(platforms: list[str], sample_size: int = 1000, stratify_by_country: bool = False,
+                           seed: Optional[int] = 1234, chunksize: int = CHUNK_SIZE) -> dict[str, set[int]]:
+    """Run create_user_data_file for each platform in parallel, one process per platform, and return
+    the sampled player ids of each platform
+
+    Repeated platforms are sampled once, so no two processes write the same files.
+    """
+    platforms = list(dict.fromkeys(platforms))
+    if not platforms:
+        return {}
+
+    with ProcessPoolExecutor(max_workers=len(platforms)) as executor:
+        futures = {platform: executor.submit(create_user_data_file, platform, sample_size,
+                                             stratify_by_country, seed, chunksize)
+                   for platform in platforms}
+        return {platform: future.result() for platform, future in futures.items()}
 
+
+if __name__ == "__main__":
+    print("starting playstation, steam, xbox")
+    create_user_data_files(["playstation", "steam", "xbox"])
+    print("finished playstation, steam, xbox")
@@ -1,5 +1,15 @@
+import os
+import pickle
+import threading
 import streamlit as st
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+from feedback import load_partition, record_ratings
+from file_parsing import get_user_data_file
+from generate_graph import WeightedGraph
+from main import get_matches, main as load_platform_graph
+
+PLATFORMS = ["steam", "xbox", "playstation"]
 
 st.set_page_config(page_title="GameMatch 🎮", layout="wide")
 
@@ -7,7 +17,7 @@ def init_session_state():
     if "page" not in st.session_state:
         st.session_state.page = "input"  # "input" or "results"
     if "matches" not in st.session_state:
-        st.session_state.matches = {}    # from dummy backend
+        st.session_state.matches = {}    # from fetch_matches
     if "ratings" not in st.session_state:
         st.session_state.ratings = {}    # match_id -> int rating
 
@@ -15,45 +25,74 @@ init_session_state()
 
 
 # ----------------------------------------------------------------
-# 1. Dummy backend fetcher
+# 1. Cached backend
 # ----------------------------------------------------------------
-def dummy_fetch_matches() -> Dict[str, Dict[int, Any]]:
+def data_version(platform: str) -> float:
+    """
+    Return when the platform's graph was last saved, so caches refresh after a feedback batch job.
+    The partition is saved inside the graph, so the two always come from the same save.
+    """
+    return os.path.getmtime(f"{platform}/platform_graph.pkl")
+
+
+PlatformData = Tuple[WeightedGraph, Dict[int, Dict[str, Any]], Dict[Any, int]]
+
+
+@st.cache_resource
+def platform_store() -> Tuple[threading.Lock, Dict[str, Tuple[float, PlatformData]]]:
+    """
+    Return the process-wide store of loaded platforms (platform -> (version, data)) and its lock.
+    Each platform keeps a single entry, so a new version of one platform never evicts another.
+    """
+    return threading.Lock(), {}
+
+
+def load_platform(platform: str, version: float) -> PlatformData:
+    """
+    Load the graph, player data and community partition of a platform once per server process
+    (and once per version of the saved graph), replacing any stale version.
+    The result is shared across all sessions and reruns, so widget interactions never reload it.
+    """
+    lock, store = platform_store()
+    with lock:
+        if platform not in store or store[platform][0] != version:
+            with st.spinner("Loading platform data..."):
+                platform_graph = load_platform_graph(platform)
+                user_data = get_user_data_file(platform)
+                partition = load_partition(platform_graph)
+            store[platform] = (version, (platform_graph, user_data, partition))
+        return store[platform][1]
+
+
+@st.cache_resource
+def warm_up() -> None:
+    """
+    Load every platform with saved data when the server starts, before the first query.
+    A platform with missing or unreadable data is skipped so it can't block the others.
     """
-    Simulate a backend response with two categories: my_community_matches & other_community_matches.
+    for platform in PLATFORMS:
+        if os.path.exists(f"{platform}/platform_graph.pkl"):
+            try:
+                load_platform(platform, data_version(platform))
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                continue
+
+
+@st.cache_data(show_spinner="Finding matches...", max_entries=1024)
+def fetch_matches(platform: str, user_id: str, game_pref: int, ach_pref: int,
+                  version: float) -> Dict[str, Dict[int, Any]]:
+    """
+    Return the user's matches in two categories: my_community_matches & other_community_matches.
+    Memoised by (platform, user, slider values, data version).
+    Raise NameError if the user is not on the platform.
     """
-    return {
-        "my_community_matches": {
-            111111: {
-                "nickname": "Alice",
-                "country": "USA",
-                "platform": "steam",
-                "library": {101,102},
-                "achievements": {1,2,3},
-                "game_similarity": 78,
-                "achievement_similarity": 63
-            },
-            222222: {
-                "nickname": "Bob",
-                "country": "UK",
-                "platform": "steam",
-                "library": {201,202,203},
-                "achievements": {7,8,9},
-                "game_similarity": 85,
-                "achievement_similarity": 90
-            }
-        },
-        "other_community_matches": {
-            333333: {
-                "nickname": "Charlie",
-                "country": "CAN",
-                "platform": "xbox",
-                "library": {300,301,302,303},
-                "achievements": {5},
-                "game_similarity": 60,
-                "achievement_similarity": 45
-            }
-        }
-    }
+    platform_graph, user_data, partition = load_platform(platform, version)
+    user = int(user_id) if user_id.isdigit() else user_id
+    prefs = {"library": game_pref / 100, "achievements": ach_pref / 100}
+    return get_matches(user, platform, platform_graph, user_data, partition, prefs)
+
+
+warm_up()
 
 
 # ----------------------------------------------------------------
@@ -63,8 +102,8 @@ def show_input_page():
     st.title("GameMatch 🎮")
     st.write("Discover Your Ultimate Gaming Companion.\n")
 
-    platform = st.selectbox("Platform", ["steam", "xbox", "playstation"])
-    user_id  = st.text_input("User ID:")
+    platform = st.selectbox("Platform", PLATFORMS)
+    user_id  = st.text_input("User ID:").strip()
 
     st.write("**Similarity Preferences (0–100):**")
     game_pref = st.slider("Game Similarity", 0, 100, 50)
@@ -72,13 +111,21 @@ def show_input_page():
 
     # A single button to fetch matches
     if st.button("Find My Matches"):
-        if not user_id.strip():
+        if not user_id:
             st.error("Please enter a valid user ID.")
         else:
-            # Simulate calling the backend
-            st.session_state.matches = dummy_fetch_matches()
-            st.session_state.page = "results"
-            st.stop()
+            try:
+                st.session_state.matches = fetch_matches(platform, user_id, game_pref, ach_pref,
+                                                         data_version(platform))
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                st.error(f"No readable saved data found for {platform}.")
+            except NameError:
+                st.error(f"User {user_id} was not found on {platform}.")
+            else:
+                st.session_state.platform = platform
+                st.session_state.user_id = user_id
+                st.session_state.page = "results"
+                st.stop()
 
 
 # ----------------------------------------------------------------
@@ -108,6 +155,8 @@ def show_results_page():
     # "Submit Ratings" if user has rated anything
     if st.session_state.ratings:
         if st.button("Submit All Ratings"):
+            record_ratings(st.session_state.platform, st.session_state.user_id,
+                           st.session_state.ratings)
             st.success("Ratings submitted!")
             st.session_state.ratings.clear()
 
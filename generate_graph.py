@@ -25,27 +25,50 @@ class Vertex:
 class WeightedGraph:
     """ A weighted graph of users
 
+    Instance Attributes:
+        - feedback_offset: the number of bytes of the feedback log already folded into the edge weights
+        - ratings: the latest rating (out of 5) given by each user to each match, keyed (user, match)
+        - base_weights: the generated weight of each edge adjusted by feedback, keyed by sorted pair
+        - partition: the saved community of each node, or None if the graph was never clustered
+
     Representation Invariants:
         - all(item == self._vertices[item].item for item in self._vertices)
+        - self.feedback_offset >= 0
     """
 
     _vertices: dict[Any, Vertex]
+    feedback_offset: int
+    ratings: dict[tuple[Any, Any], int]
+    base_weights: dict[tuple[Any, Any], float]
+    partition: Optional[dict[Any, int]]
 
     def __init__(self):
         """Initializing an empty graph"""
         self._vertices = {}
+        self.feedback_offset = 0
+        self.ratings = {}
+        self.base_weights = {}
+        self.partition = None
 
     def __getstate__(self):
         """Custom method to pickle only necessary data (no deep recursion)."""
         return {
             "vertices": {k: v.item for k, v in self._vertices.items()},
             "edges": [(v1.item, v2.item, weight) for v1 in self._vertices.values()
-                      for v2, weight in v1.neighbours.items()]
+                      for v2, weight in v1.neighbours.items()],
+            "feedback_offset": self.feedback_offset,
+            "ratings": self.ratings,
+            "base_weights": self.base_weights,
+            "partition": self.partition
         }
 
     def __setstate__(self, state):
         """Custom method to reconstruct graph from saved state."""
         self._vertices = {k: Vertex(k) for k in state["vertices"]}
+        self.feedback_offset = state.get("feedback_offset", 0)
+        self.ratings = state.get("ratings", {})
+        self.base_weights = state.get("base_weights", {})
+        self.partition = state.get("partition")
         for v1, v2, weight in state["edges"]:
             self.add_edge(v1, v2, weight)
 
@@ -78,8 +101,9 @@ class WeightedGraph:
         """returns all vertices in the graph"""
         return self._vertices
 
-    def cluster(self) -> dict[Any, int]:
+    def cluster(self, items: Optional[set] = None) -> dict[Any, int]:
         """Cluster graph nodes into groups of similarity (user communities) using Louvain Method.
+        If items is given, only the subgraph induced by items is clustered.
 
         Returns:
             A dictionary mapping each node to its assigned cluster.
@@ -89,8 +113,14 @@ class WeightedGraph:
 
         # add edges and weights
         for vertex in self._vertices.values():
+            if items is not None and vertex.item not in items:
+                continue
             for neighbor, weight in vertex.neighbours.items():
-                nx_graph.add_edge(vertex.item, neighbor.item, weight=weight)
+                if items is None or neighbor.item in items:
+                    nx_graph.add_edge(vertex.item, neighbor.item, weight=weight)
+
+        if nx_graph.number_of_nodes() == 0:
+            return {}
 
         # apply clustering
         partition = community.best_partition(nx_graph, weight='weight')
@@ -104,9 +134,14 @@ class WeightedGraph:
         """
         pass
 
-    def dynamic_adjustment(self, node_1, node_2, new_weight):
-        """change the weight between two nodes to new_weight"""
-        pass
+    def dynamic_adjustment(self, node_1: Any, node_2: Any, new_weight: float) -> None:
+        """change the weight between two nodes to new_weight
+        Raise ValueError if node_1 or node_2 are not in self._vertices, if they are the same node
+        or if new_weight is negative
+        """
+        if node_1 == node_2 or new_weight < 0:
+            raise ValueError
+        self.add_edge(node_1, node_2, new_weight)
 
 
 if __name__ == "__main__":
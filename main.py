@@ -14,6 +14,10 @@ import time
 #
 
 
+# the preferences the saved platform graphs are generated with
+GRAPH_PREFS = {"library": 1, "achievements": 1}
+
+
 def get_weight(user_1: Any, user_2: Any, data: dict[int, dict], prefs: dict[str, float]) -> float:
     """ Return the weight between two nodes(user_1 and user_2) in a graph (data) by calculating
     their similarity and scaling by user preferences in prefs
@@ -25,23 +29,82 @@ def get_weight(user_1: Any, user_2: Any, data: dict[int, dict], prefs: dict[str,
 
     """
     if user_1 in data and user_2 in data:
+        game_similarity, achievement_similarity = get_similarities(user_1, user_2, data)
 
-        # getting game_similarity as a preference
-        similar_games = data[user_1]["library"].intersection(data[user_2]["library"])
-        all_games = data[user_1]["library"].union(data[user_2]["library"])
-        game_similarity = prefs["library"] * (len(similar_games)/len(all_games))
+        # scaling each similarity by user preferences
+        return prefs["library"] * game_similarity + prefs["achievements"] * achievement_similarity
 
-        # getting achievement similarity for similar games
-        similar_achevs = data[user_1]["achievements"].intersection(data[user_2]["achievements"])
-        all_achevs = data[user_1]["achievements"].union(data[user_2]["achievements"])
-        achievement_similarity = prefs["achievements"] * (len(similar_achevs) / len(all_achevs))
+    else:
+        raise NameError
 
-        # 3. Final weight calculation
-        return game_similarity + achievement_similarity
 
-    else:
+def get_similarities(user_1: Any, user_2: Any, data: dict[int, dict]) -> tuple[float, float]:
+    """ Return the (game_similarity, achievement_similarity) of user_1 and user_2 in data as
+    fractions in [0, 1], without any preference scaling
+
+    Preconditions:
+        - user_1 in data and user_2 in data
+    """
+    all_games = set(data[user_1]["library"]).union(data[user_2]["library"])
+    similar_games = set(data[user_1]["library"]).intersection(data[user_2]["library"])
+    all_achevs = set(data[user_1]["achievements"]).union(data[user_2]["achievements"])
+    similar_achevs = set(data[user_1]["achievements"]).intersection(data[user_2]["achievements"])
+
+    game_similarity = len(similar_games) / len(all_games) if all_games else 0.0
+    achievement_similarity = len(similar_achevs) / len(all_achevs) if all_achevs else 0.0
+    return game_similarity, achievement_similarity
+
+
+def get_matches(user: Any, platform: str, platform_graph: WeightedGraph, data: dict[int, dict],
+                partition: dict[Any, int], prefs: dict[str, float],
+                limit: int = 5) -> dict[str, dict[Any, dict]]:
+    """ Return the best matches for user, split into players in the same community (cluster in
+    partition) as user and players in other communities
+
+    Candidates are the neighbours of user in platform_graph, ranked by their similarity to user
+    scaled by prefs, times the ratio of the stored edge weight to the weight the graph was generated
+    with, so edges adjusted by rating feedback move up or down the ranking. Each match maps to the
+    player's data along with game_similarity and achievement_similarity as percentages.
+
+    Raise NameError if user is not a vertex in platform_graph or not in data.
+    """
+    vertices = platform_graph.get_vertices()
+    if user not in vertices or user not in data:
         raise NameError
 
+    scored = []
+    for neighbour in vertices[user].neighbours:
+        other = neighbour.item
+        if other not in data:
+            continue
+        game_similarity, achievement_similarity = get_similarities(user, other, data)
+        score = prefs["library"] * game_similarity + prefs["achievements"] * achievement_similarity
+
+        base_weight = (GRAPH_PREFS["library"] * game_similarity
+                       + GRAPH_PREFS["achievements"] * achievement_similarity)
+        if base_weight > 0:
+            score *= vertices[user].neighbours[neighbour] / base_weight
+        scored.append((score, other, game_similarity, achievement_similarity))
+    scored.sort(key=lambda match: match[0], reverse=True)
+
+    matches = {"my_community_matches": {}, "other_community_matches": {}}
+    user_community = partition.get(user)
+    for _, other, game_similarity, achievement_similarity in scored:
+        if partition.get(other) == user_community:
+            category = matches["my_community_matches"]
+        else:
+            category = matches["other_community_matches"]
+
+        if len(category) < limit:
+            category[other] = {**data[other],
+                               "platform": platform,
+                               "game_similarity": round(game_similarity * 100),
+                               "achievement_similarity": round(achievement_similarity * 100)}
+        if all(len(category) >= limit for category in matches.values()):
+            break
+
+    return matches
+
 
 def main(platform):
     """main function to run graph generation"""
@@ -49,7 +112,7 @@ def main(platform):
     mode = "save_state"  # -----------------add pygame option selection
     # platform = "playstation" # -----------add pygame option selection
     playerid = "371169"  # -----------------add pygame option selection
-    prefs = {"library": 1, "achievements": 1}
+    prefs = GRAPH_PREFS
 
     if mode != "save_state":
         platform_graph = WeightedGraph()